@@ -1,7 +1,11 @@
+import copy
 import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 from pyscf import gto, scf
-from pyscf.lib import logger
+from pyscf.lib import logger, unpack_tril, with_omp_threads
 from pyscf.scf.hf import RHF
 from pyscf.fci.direct_spin0 import FCISolver
 from pyscf.ao2mo import restore
@@ -10,21 +14,55 @@ import numpy
 from scipy import special, linalg
 
 
-def transform(o, psi, axes="all", mode="fast"):
+@lru_cache(maxsize=256)
+def einsum_plan(shape, psi_shape, axes, optimize="greedy"):
     """
-    A generic transform routine using numpy.einsum.
+    Prepares subscripts and the contraction path of a single-call transform. The result is cached per shapes such
+    that repeated transforms of same-shaped tensors skip parsing and path optimization.
     Args:
-        o (numpy.ndarray): a vector/matrix/tensor to transform;
-        psi (numpy.ndarray): a basis to transform to;
+        shape (tuple): the shape of the tensor to transform;
+        psi_shape (tuple): the shape of the basis to transform to;
+        axes (tuple): dimensions to transform along;
+        optimize (str): the path optimization strategy of `numpy.einsum_path`;
+
+    Returns:
+        Einsum subscripts and the contraction path.
+    """
+    n = len(shape)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    o_subscripts = letters[:n]
+    output_subscripts = str(o_subscripts)
+    letters = letters[n:]
+    p_subscripts = ""
+    for i, ax in enumerate(axes):
+        p_subscripts += ","+o_subscripts[ax]+letters[i]
+        output_subscripts = output_subscripts[:ax]+letters[i]+output_subscripts[ax+1:]
+    subscripts = o_subscripts+p_subscripts+"->"+output_subscripts
+    # Only shapes matter for path optimization: use zero-stride placeholders
+    operands = (numpy.broadcast_to(0., shape),) + (numpy.broadcast_to(0., psi_shape),)*len(axes)
+    path, _ = numpy.einsum_path(subscripts, *operands, optimize=optimize)
+    return subscripts, path
+
+
+def build_transformer(shape, psi_shape, axes="all", mode="fast"):
+    """
+    Prepares a transform of arrays with fixed shapes, see `transform`. Subscripts, contraction paths and intermediate
+    shapes are computed once such that the returned function can be called repeatedly with little overhead.
+    Args:
+        shape (tuple): the shape of arrays to transform;
+        psi_shape (tuple): the shape of the basis to transform to;
         axes (list, str): dimensions to transform along;
-        mode (str): mode, either 'onecall', calls numpy.einsum once, or 'fast' transforming one axis at a time.
+        mode (str): mode, either 'onecall', calls numpy.einsum once with a greedy contraction order, or 'fast'
+        choosing the cheapest order of per-axis contractions.
 
     Returns:
-        A transformed array.
+        A function `f(o, psi)` transforming an array.
     """
-    n = len(o.shape)
+    shape = tuple(shape)
+    psi_shape = tuple(psi_shape)
+    n = len(shape)
     if axes == "all":
-        axes = range(n)
+        axes = tuple(range(n))
     elif axes == "f2":
         axes = (0, 1)
     elif axes == "l2":
@@ -33,25 +71,59 @@ def transform(o, psi, axes="all", mode="fast"):
         axes = (axes,)
     else:
         axes = tuple(axes)
-    if mode == "fast":
-        result = o
-        for a in axes:
-            result = transform(result, psi, axes=a, mode='onecall')
-        return result
+    if mode == "fast" and axes == tuple(range(n)):
+        # Contract the leading axis with a single GEMM and append the new axis at the end: after n steps axes are back
+        # in order without any transposition copies
+        steps = shape
+        result_shape = (psi_shape[1],) * n
+
+        def transformer(o, psi):
+            result = o
+            for s in steps:
+                result = numpy.dot(result.reshape(s, -1).T, psi)
+            return result.reshape(result_shape)
+
+    elif mode == "fast" or mode == "onecall" and len(axes) != 1:
+        if mode == "fast":
+            # The exhaustive search is only affordable for a few operands
+            optimize = "optimal" if len(axes) <= 4 else "greedy"
+        else:
+            optimize = "greedy"
+        subscripts, path = einsum_plan(shape, psi_shape, axes, optimize=optimize)
+
+        def transformer(o, psi):
+            return numpy.einsum(subscripts, o, *((psi,)*len(axes)), optimize=path)
+
     elif mode == "onecall":
-        letters = "abcdefghijklmnopqrstuvwxyz"
-        o_subscripts = letters[:n]
-        output_subscripts = str(o_subscripts)
-        letters = letters[n:]
-        p_subscripts = ""
-        for i, ax in enumerate(axes):
-            p_subscripts += ","+o_subscripts[ax]+letters[i]
-            output_subscripts = output_subscripts[:ax]+letters[i]+output_subscripts[ax+1:]
-        subscripts = o_subscripts+p_subscripts+"->"+output_subscripts
-        return numpy.einsum(subscripts, o, *((psi,)*len(axes)))
+        # A single contraction is a matrix product
+        a = axes[0]
+        result_shape = (psi_shape[1],) + shape[:a] + shape[a+1:]
+
+        def transformer(o, psi):
+            result = numpy.dot(psi.T, numpy.moveaxis(o, a, 0).reshape(shape[a], -1))
+            return numpy.moveaxis(result.reshape(result_shape), 0, a)
+
     else:
         raise ValueError("Unknown mode: {}".format(mode))
 
+    return transformer
+
+
+def transform(o, psi, axes="all", mode="fast"):
+    """
+    A generic transform routine using numpy.einsum.
+    Args:
+        o (numpy.ndarray): a vector/matrix/tensor to transform;
+        psi (numpy.ndarray): a basis to transform to;
+        axes (list, str): dimensions to transform along;
+        mode (str): mode, either 'onecall', calls numpy.einsum once with a greedy contraction order, or 'fast'
+        choosing the cheapest order of per-axis contractions.
+
+    Returns:
+        A transformed array.
+    """
+    return build_transformer(o.shape, psi.shape, axes=axes, mode=mode)(o, psi)
+
 
 class AbstractIntegralProvider(object):
     def __init__(self, mol):
@@ -61,7 +133,18 @@ class AbstractIntegralProvider(object):
             mol (pyscf.gto.mole.Mole): the Mole object;
         """
         self.__mol__ = mol
-        self.__ao_ownership__ = numpy.array(tuple(i[0] for i in self.__mol__.ao_labels(fmt=False)))
+        # The narrowest integer type holding atom indexes keeps ownership lookups cheap
+        self.__atom_dtype__ = numpy.min_scalar_type(max(self.__mol__.natm - 1, 0))
+        self.__ao_ownership__ = numpy.fromiter(
+            (i[0] for i in self.__mol__.ao_labels(fmt=False)),
+            dtype=self.__atom_dtype__,
+        )
+        self.__shell_ownership__ = self.__mol__._bas[:, gto.ATOM_OF].astype(self.__atom_dtype__)
+        self.__atom_basis_size__ = numpy.bincount(
+            self.__shell_ownership__,
+            weights=numpy.diff(self.__mol__.ao_loc_nr(cart=True)),
+            minlength=self.__mol__.natm,
+        ).astype(int)
 
     def get_atom_basis(self, atoms, domain=None):
         """
@@ -74,15 +157,11 @@ class AbstractIntegralProvider(object):
             A list of basis functions' indices.
         """
         ao = self.__ao_ownership__
-        atoms = self.__dressed_atoms__(atoms)
+        mask = numpy.isin(ao, numpy.asarray(self.__dressed_atoms__(atoms), dtype=self.__atom_dtype__))
         if domain is not None:
-            mask = (ao[:, numpy.newaxis] == numpy.array(domain)[numpy.newaxis, :]).sum(axis=1)
-            ao = ao[numpy.argwhere(mask)]
-        if atoms is None:
-            return numpy.arange(len(ao))
-        else:
-            mask = (ao[:, numpy.newaxis] == numpy.array(atoms)[numpy.newaxis, :]).sum(axis=1)
-            return numpy.nonzero(mask)[0]
+            # Indexes are local to the domain
+            mask = mask[numpy.isin(ao, numpy.asarray(domain, dtype=self.__atom_dtype__))]
+        return numpy.flatnonzero(mask)
 
     def get_block(self, *atoms):
         """
@@ -92,9 +171,18 @@ class AbstractIntegralProvider(object):
             dims (int): the number of dimensions;
 
         Returns:
-            A slice for the diagonal block.
+            A slice for the diagonal block. Contiguous sets of basis functions are represented by slices such that
+            the block is a view whenever possible.
         """
-        return numpy.ix_(*tuple(self.get_atom_basis(i) for i in atoms))
+        basis = tuple(self.get_atom_basis(i) for i in atoms)
+        result = tuple(
+            slice(i[0], i[-1] + 1) if len(i) > 0 and i[-1] - i[0] + 1 == len(i) else i
+            for i in basis
+        )
+        if sum(isinstance(i, numpy.ndarray) for i in result) > 1:
+            # Several index arrays are broadcast together: an open mesh is required
+            return numpy.ix_(*basis)
+        return result
 
     def __dressed_atoms__(self, atoms):
         if atoms is None:
@@ -114,14 +202,10 @@ class AbstractIntegralProvider(object):
             A list of tuples with ranges of shell slices.
         """
         atoms = self.__dressed_atoms__(atoms)
-        result = numpy.zeros(self.__mol__._bas.shape[0] + 2, dtype=bool)
-        for a in atoms:
-            result[1:-1] = numpy.logical_or(result[1:-1], self.__mol__._bas[:, gto.ATOM_OF] == a)
-        r1 = result[:-1]
-        r2 = result[1:]
-        fr = numpy.argwhere(numpy.logical_and(numpy.logical_not(r1), r2))[:, 0]
-        to = numpy.argwhere(numpy.logical_and(r1, numpy.logical_not(r2)))[:, 0]
-        return numpy.stack((fr, to), axis=1)
+        mask = numpy.isin(self.__shell_ownership__, numpy.asarray(atoms, dtype=self.__atom_dtype__))
+        # Edges of contiguous runs of shells alternate: beginning, end, beginning, ...
+        edges = numpy.flatnonzero(numpy.diff(numpy.concatenate(([0], mask, [0])).astype(numpy.int8)))
+        return edges.reshape(-1, 2)
 
     def atomic_basis_size(self, atom):
         """
@@ -132,7 +216,7 @@ class AbstractIntegralProvider(object):
         Returns:
             The total number of basis functions.
         """
-        return sum(self.__mol__.bas_len_cart(i) for i in self.__mol__.atom_shell_ids(atom))
+        return int(self.__atom_basis_size__[atom])
 
     def intor_atoms(self, name, *atoms, **kwargs):
         """
@@ -147,6 +231,17 @@ class AbstractIntegralProvider(object):
         """
         raise NotImplementedError
 
+    def batch_intor(self, requests):
+        """
+        Computes several integrals.
+        Args:
+            requests (list): a list of tuples with `intor_atoms` arguments: `(name, atoms1, atoms2, ...)`;
+
+        Returns:
+            A list of arrays or tensors with integrals.
+        """
+        return list(self.intor_atoms(*i) for i in requests)
+
     def get_ovlp(self, atoms1, atoms2):
         """
         Retrieves an overlap matrix.
@@ -209,62 +304,251 @@ class AbstractIntegralProvider(object):
         """
         return self.intor_atoms("int2e_sph", atoms1, atoms2, atoms3, atoms4)
 
+    def iter_eri_tiles(self, atoms1, atoms2, atoms3, atoms4, tile=2):
+        """
+        Iterates over electron repulsion integrals in tiles along the first index such that only one tile is held in
+        memory at a time.
+        Args:
+            atoms1 (list, tuple): a subset of atoms where the basis functions reside (first index);
+            atoms2 (list, tuple): a subset of atoms where the basis functions reside (second index);
+            atoms3 (list, tuple): a subset of atoms where the basis functions reside (third index);
+            atoms4 (list, tuple): a subset of atoms where the basis functions reside (fourth index);
+            tile (int): the number of atoms per tile in the first index;
+
+        Yields:
+            Four-index tensors with ERIs for consecutive tiles of `atoms1`.
+        """
+        atoms1 = self.__dressed_atoms__(atoms1)
+        for i in range(0, len(atoms1), tile):
+            yield self.get_eri(atoms1[i:i+tile], atoms2, atoms3, atoms4)
+
+
+def with_shells(mol, shells):
+    """
+    Prepares a shallow copy of the Mole object with a subset of shells. The original object is left intact such that
+    integrals can be evaluated concurrently.
+    Args:
+        mol (pyscf.mol.Mole): the Mole object;
+        shells (numpy.ndarray): shell indexes to keep;
+
+    Returns:
+        A new Mole object.
+    """
+    result = copy.copy(mol)
+    result._bas = mol._bas[shells, :]
+    return result
+
 
-def intor(mol, name, *shells, **kwargs):
+@lru_cache(maxsize=None)
+def thread_pool():
+    """
+    Retrieves a thread pool shared by integral providers. Integral evaluation in pyscf releases the GIL.
+    Returns:
+        A thread pool executor.
+    """
+    return ThreadPoolExecutor(max_workers=os.cpu_count())
+
+
+def get_ao_loc(mol, name):
+    """
+    Retrieves basis function offsets of each shell for the given integral.
+    Args:
+        mol (pyscf.mol.Mole): the Mole object;
+        name (str): integral name;
+
+    Returns:
+        An array with offsets.
+    """
+    return mol.ao_loc_nr(cart=name.endswith("_cart") or (mol.cart and not name.endswith("_sph")))
+
+
+def intor(mol, name, *shells, ao_loc=None, **kwargs):
     """
     A version of `pyscf.mole.Mole.intor` accepting lists of shell ranges instead of single ranges.
     Args:
         mol (pyscf.mol.Mole): the Mole object;
         name (str): integral name;
         *shells (nested list): shell ranges lists;
+        ao_loc (numpy.ndarray): pre-computed offsets of shells, see `get_ao_loc`;
         **kwargs: keywords passed to `pyscf.mole.Mole.intor`;
 
     Returns:
         An array with integrals.
     """
-    shls_slice = tuple()
-    basis_size = []
-    for dim, shell_list in enumerate(shells):
-        shell_list = numpy.array(shell_list)
+    # Collect shell ranges of each dimension
+    ranges = []
+    for shell_list in shells:
+        shell_list = numpy.array(shell_list, dtype=int)
         if len(shell_list.shape) == 1:
-            shls_slice += tuple(shell_list)
+            shell_list = shell_list[numpy.newaxis, :]
         elif len(shell_list.shape) != 2:
             raise ValueError("Cannot recognize shell list: {}".format(repr(shell_list)))
-        elif len(shell_list) == 1:
-            shls_slice += tuple(shell_list[0])
-        else:
-            ints = []
-            for sh in shell_list:
-                ints.append(intor(mol, name, *list(shells[:dim]+(sh,)+shells[dim+1:]), **kwargs))
-            return numpy.concatenate(ints, axis=dim)
-        basis_size.append(sum(
-            mol.bas_len_cart(i) for i in range(shls_slice[-2], shls_slice[-1])
-        ))
-
-    if "do_not_hack_pyscf" in kwargs:
-        kwargs["shls_slice"] = shls_slice
-        result = mol.intor(name, **kwargs).view()
-
+        ranges.append(shell_list)
+
+    hack = "do_not_hack_pyscf" not in kwargs
+    kwargs.pop("do_not_hack_pyscf", None)
+    if ao_loc is None:
+        ao_loc = get_ao_loc(mol, name)
+    shell_size = ao_loc[1:] - ao_loc[:-1]
+    shell_ids = tuple(numpy.concatenate(tuple(numpy.arange(fr, to) for fr, to in shell_list)) for shell_list in ranges)
+    basis_size = tuple(int(shell_size[i].sum()) for i in shell_ids)
+    shls_slice = numpy.empty(2 * len(ranges), dtype=numpy.int32)
+
+    if hack:
+        # Shells of each dimension are stacked (duplicated if needed) into a contiguous range: a single call evaluates
+        # exactly the integrals requested
+        bas_ids = []
+        placed = {}
+        n = 0
+        for dim, i in enumerate(shell_ids):
+            key = i.tobytes()
+            if key not in placed:
+                placed[key] = n, n + len(i)
+                bas_ids.append(i)
+                n += len(i)
+            shls_slice[2*dim:2*dim+2] = placed[key]
+        kwargs["shls_slice"] = shls_slice.tolist()
+        result = with_shells(mol, numpy.concatenate(bas_ids)).intor(name, **kwargs)
+        return result.reshape(basis_size)
+
+    # Shells stay in place: a single shell slice encloses all ranges of each dimension
+    hull = tuple((shell_list[:, 0].min(), shell_list[:, 1].max()) for shell_list in ranges)
+    hull_size = tuple(int(ao_loc[to] - ao_loc[fr]) for fr, to in hull)
+    overhead = tuple(1.0 * h / max(s, 1) for h, s in zip(hull_size, basis_size))
+    if numpy.prod(overhead) > 2:
+        # Too many integrals outside requested ranges: split the worst dimension into separate calls
+        dim = max(
+            (i for i in range(len(ranges)) if len(ranges[i]) > 1),
+            key=lambda i: overhead[i],
+            default=None,
+        )
+        if dim is not None:
+            result = None
+            offset = 0
+            for shell_list in ranges[dim]:
+                block = intor(
+                    mol, name, *(ranges[:dim] + [shell_list] + ranges[dim+1:]),
+                    ao_loc=ao_loc, do_not_hack_pyscf=True, **kwargs
+                )
+                if result is None:
+                    result = numpy.empty(basis_size, dtype=block.dtype)
+                result[(slice(None),) * dim + (slice(offset, offset + block.shape[dim]),)] = block
+                offset += block.shape[dim]
+            return result
+
+    indexes = []
+    for dim, (shell_list, (fr_hull, to_hull)) in enumerate(zip(ranges, hull)):
+        shls_slice[2*dim:2*dim+2] = fr_hull, to_hull
+        indexes.append(numpy.concatenate(tuple(
+            numpy.arange(ao_loc[fr], ao_loc[to]) for fr, to in shell_list
+        )) - ao_loc[fr_hull])
+    kwargs["shls_slice"] = shls_slice.tolist()
+    result = mol.intor(name, **kwargs).reshape(hull_size)
+    if all(numpy.array_equal(i, numpy.arange(s)) for i, s in zip(indexes, hull_size)):
+        return result
     else:
-        bas = mol._bas
-        shells = sorted(set(sum((list(range(i, j)) for i, j in zip(shls_slice[::2], shls_slice[1::2])), [])))
-        mol._bas = mol._bas[shells, :]
-        shls_slice = tuple(numpy.searchsorted(shells, i) for i in shls_slice)
+        return result[numpy.ix_(*indexes)]
 
-        kwargs["shls_slice"] = shls_slice
-        result = mol.intor(name, **kwargs).view()
 
-        mol._bas = bas
-    result.shape = tuple(basis_size)
-    return result
+class IntegralProvider(AbstractIntegralProvider):
+    def __init__(self, mol):
+        AbstractIntegralProvider.__init__(self, mol)
+        self.__ao_loc__ = {}
 
+    __init__.__doc__ = AbstractIntegralProvider.__init__.__doc__
 
-class IntegralProvider(AbstractIntegralProvider):
     def intor_atoms(self, name, *atoms, **kwargs):
-        return intor(self.__mol__, name, *(self.shell_ranges(i) for i in atoms), **kwargs)
+        if name not in self.__ao_loc__:
+            self.__ao_loc__[name] = get_ao_loc(self.__mol__, name)
+        return intor(
+            self.__mol__,
+            name,
+            *(self.shell_ranges(i) for i in atoms),
+            ao_loc=self.__ao_loc__[name],
+            **kwargs
+        )
 
     intor_atoms.__doc__ = AbstractIntegralProvider.intor_atoms.__doc__
 
+    def batch_intor(self, requests):
+        def evaluate(request):
+            # Workers already occupy all cores: OpenMP threads within pyscf would oversubscribe them
+            with with_omp_threads(1):
+                return self.intor_atoms(*request)
+
+        return list(thread_pool().map(evaluate, requests))
+
+    batch_intor.__doc__ = AbstractIntegralProvider.batch_intor.__doc__
+
+    def get_hcore(self, atoms1, atoms2):
+        # Integrals are evaluated anew on each call: accumulate in place
+        result = self.get_kin(atoms1, atoms2)
+        numpy.add(result, self.get_ext_pot(atoms1, atoms2), out=result)
+        return result
+
+    get_hcore.__doc__ = AbstractIntegralProvider.get_hcore.__doc__
+
+    def get_eri_sym(self, atoms1, atoms2, atoms3, atoms4, aosym="s4"):
+        """
+        Retrieves a subset of electron repulsion integrals in a packed form exploiting the permutational symmetry.
+        Args:
+            atoms1 (list, tuple): a subset of atoms where the basis functions reside (first index);
+            atoms2 (list, tuple): a subset of atoms where the basis functions reside (second index);
+            atoms3 (list, tuple): a subset of atoms where the basis functions reside (third index);
+            atoms4 (list, tuple): a subset of atoms where the basis functions reside (fourth index);
+            aosym (str): the symmetry, either 's4' requiring `atoms1 == atoms2` and `atoms3 == atoms4` or 's8'
+            requiring all subsets of atoms to be the same;
+
+        Returns:
+            Packed ERIs, see `unpack_eri`.
+        """
+        atoms = tuple(tuple(sorted(set(self.__dressed_atoms__(i)))) for i in (atoms1, atoms2, atoms3, atoms4))
+        if aosym == "s4":
+            valid = atoms[0] == atoms[1] and atoms[2] == atoms[3]
+        elif aosym == "s8":
+            valid = atoms[0] == atoms[1] == atoms[2] == atoms[3]
+        else:
+            raise ValueError("Unknown symmetry: {}".format(aosym))
+        if not valid:
+            raise ValueError("Subsets of atoms are not compatible with the symmetry {}".format(aosym))
+
+        shells = tuple(
+            numpy.concatenate(tuple(numpy.arange(fr, to) for fr, to in self.shell_ranges(i)))
+            for i in (atoms[0], atoms[2])
+        )
+        if aosym == "s8":
+            mol = with_shells(self.__mol__, shells[0])
+            kwargs = dict()
+        else:
+            # Shells of both pairs are stacked (possibly duplicated) to make each pair range contiguous
+            mol = with_shells(self.__mol__, numpy.concatenate(shells))
+            n1, n = len(shells[0]), len(shells[0]) + len(shells[1])
+            kwargs = dict(shls_slice=(0, n1, 0, n1, n1, n, n1, n))
+        return mol.intor("int2e_sph", aosym=aosym, **kwargs)
+
+
+def unpack_eri(eri, aosym):
+    """
+    Unpacks electron repulsion integrals stored with permutational symmetry.
+    Args:
+        eri (numpy.ndarray): packed ERIs;
+        aosym (str): the symmetry of the packed ERIs, either 's4' or 's8';
+
+    Returns:
+        A four-index tensor with ERIs.
+    """
+    if aosym == "s8":
+        n_pairs = int(((8 * len(eri) + 1) ** .5 - 1) / 2)
+        n = int(((8 * n_pairs + 1) ** .5 - 1) / 2)
+        return restore(1, eri, n)
+    elif aosym == "s4":
+        eri = unpack_tril(eri, axis=-1)
+        n = eri.shape[-1]
+        eri = unpack_tril(eri.reshape(eri.shape[0], -1).T, axis=-1)
+        return eri.reshape((n, n) + eri.shape[1:]).transpose(2, 3, 0, 1)
+    else:
+        raise ValueError("Unknown symmetry: {}".format(aosym))
+
 
 def as_dict(tensor, provider):
     """
@@ -363,30 +647,53 @@ class SimpleCachingIntegralProvider(IntegralProvider):
         atoms = tuple(self.__dressed_atoms__(i) for i in atoms)
         if name not in self.cache:
             self.cache[name] = {}
-        isolated = tuple()
-        for ax, a in enumerate(atoms):
-            if len(a) == 1:
-                isolated += a
-            if len(a) != 1:
-                return numpy.concatenate(
-                    tuple(self.intor_atoms(name, *(atoms[:ax]+(i,)+atoms[ax+1:])) for i in a),
-                    axis=ax,
-                )
         cache = self.cache[name]
-        self.__stat_1__ += 1
-        if isolated not in cache:
-            self.__stat_2__ += 1
-            cache[isolated] = IntegralProvider.intor_atoms(self, name, *isolated)
-        return cache[isolated]
+        blocks = {}
+        for isolated in itertools.product(*atoms):
+            self.__stat_1__ += 1
+            if isolated not in cache:
+                self.__stat_2__ += 1
+                cache[isolated] = IntegralProvider.intor_atoms(self, name, *isolated)
+            blocks[isolated] = cache[isolated]
+        if all(len(a) == 1 for a in atoms):
+            return blocks[isolated]
+
+        # Offsets of atomic blocks along each dimension
+        first = tuple(a[0] for a in atoms)
+        offsets = tuple(
+            numpy.cumsum((0,) + tuple(blocks[first[:ax]+(i,)+first[ax+1:]].shape[ax] for i in a))
+            for ax, a in enumerate(atoms)
+        )
+        # Blocks are copied into the preallocated result directly
+        result = numpy.empty(tuple(o[-1] for o in offsets), dtype=blocks[first].dtype)
+        for index in itertools.product(*(range(len(a)) for a in atoms)):
+            result[tuple(slice(o[i], o[i+1]) for o, i in zip(offsets, index))] = \
+                blocks[tuple(a[i] for a, i in zip(atoms, index))]
+        return result
 
     intor_atoms.__doc__ = IntegralProvider.intor_atoms.__doc__
 
+    def iter_eri_tiles(self, atoms1, atoms2, atoms3, atoms4, tile=2):
+        # Tiles bypass the cache: caching them would retain the full tensor anyway
+        atoms1 = self.__dressed_atoms__(atoms1)
+        for i in range(0, len(atoms1), tile):
+            yield IntegralProvider.intor_atoms(self, "int2e_sph", atoms1[i:i+tile], atoms2, atoms3, atoms4)
+
+    iter_eri_tiles.__doc__ = IntegralProvider.iter_eri_tiles.__doc__
+
+    # Cached integrals are shared and cannot be accumulated in place; the cache is not thread-safe
+    get_hcore = AbstractIntegralProvider.get_hcore
+    batch_intor = AbstractIntegralProvider.batch_intor
+
     def cache_factor(self):
         """
         Calculates number of cache accesses relative to the number of integral evaluations.
         Returns:
-            Cache factor.
+            Cache factor, NaN if no integrals were evaluated through the cache.
         """
+        if self.__stat_2__ == 0:
+            # Nothing was evaluated through the cache
+            return float("nan")
         return 1.0*self.__stat_1__ / self.__stat_2__
 
 
@@ -115,7 +115,10 @@ class Domain(object):
         self.d2i = provider.get_block(self.atoms, self.atoms)
         self.hcore = provider.get_hcore(self.atoms, self.atoms)
         self.ovlp = provider.get_ovlp(self.atoms, self.atoms)
-        self.eri = provider.get_eri(self.atoms, self.atoms, self.atoms, self.atoms)
+        self.eri = common.unpack_eri(
+            provider.get_eri_sym(self.atoms, self.atoms, self.atoms, self.atoms, aosym="s8"),
+            "s8",
+        )
 
         self.mol = provider.__mol__.copy()
         self.mol._bas = numpy.concatenate(tuple(self.mol._bas[start:end] for start, end in self.shell_ranges), axis=0)
@@ -225,13 +228,19 @@ class DCHF(HFLocalIntegralProvider):
             self.eri_j[i, i] = d.eri
             self.eri_k[i, i] = d.eri
         # Off-diagonal
-        for i, d1 in enumerate(self.domains):
-            for j, d2 in enumerate(self.domains):
-                if j > i:
-                    self.eri_j[i, j] = self.get_eri(d1.atoms, d1.atoms, d2.atoms, d2.atoms)
-                    self.eri_j[j, i] = self.eri_j[i, j].transpose((2, 3, 0, 1))
-                    self.eri_k[i, j] = self.get_eri(d1.atoms, d2.atoms, d2.atoms, d1.atoms)
-                    self.eri_k[j, i] = self.eri_k[i, j].transpose((1, 0, 3, 2))
+        pairs = list((i, j) for i in range(len(self.domains)) for j in range(i + 1, len(self.domains)))
+        requests = []
+        for i, j in pairs:
+            d1, d2 = self.domains[i], self.domains[j]
+            requests.append(("int2e_sph", d1.atoms, d2.atoms, d2.atoms, d1.atoms))
+        for (i, j), eri_k in zip(pairs, self.batch_intor(requests)):
+            d1, d2 = self.domains[i], self.domains[j]
+            # Coulomb blocks are symmetric within each pair of indexes
+            eri_j = common.unpack_eri(self.get_eri_sym(d1.atoms, d1.atoms, d2.atoms, d2.atoms, aosym="s4"), "s4")
+            self.eri_j[i, j] = eri_j
+            self.eri_j[j, i] = eri_j.transpose((2, 3, 0, 1))
+            self.eri_k[i, j] = eri_k
+            self.eri_k[j, i] = eri_k.transpose((1, 0, 3, 2))
 
     def domains_cover(self, r=True):
         """
@@ -82,7 +82,7 @@ def get_lmp2_residuals(mp2_t2, oovv, fock_occ, fock_virt, ovlp, sparsity_desc, k
     return result
 
 
-def get_lmp2_correction(r_pao, fock_occ, fock_basis_local, fock_energies_local):
+def get_lmp2_correction(r_pao, fock_occ, fock_basis_local, fock_energies_local, transformers=None):
     """
     Transforms residuals into correction to the LMP2 amplitudes.
     Args:
@@ -90,6 +90,8 @@ def get_lmp2_correction(r_pao, fock_occ, fock_basis_local, fock_energies_local):
         fock_occ (numpy.ndarray): occupied Fock matrix;
         fock_basis_local (dict): local virtual (PAO) basis for the pairs;
         fock_energies_local (dict): local virtual (PAO) basis eigenvalues for the pairs;
+        transformers (dict): prepared transforms to and from the local virtual basis for the pairs, see
+        `common.build_transformer`;
 
     Returns:
         A sparse correction to the LMP2 amplitudes.
@@ -100,12 +102,14 @@ def get_lmp2_correction(r_pao, fock_occ, fock_basis_local, fock_energies_local):
     for k, v in r_pao.items():
         basis = fock_basis_local[k]
         virt_e = fock_energies_local[k]
+        transform = common.transform if transformers is None else transformers[k]
         # dual = numpy.linalg.inv(basis).T
-        v = common.transform(v, basis)
+        v = transform(v, basis)
 
         denominator = fock_occ[k[0], k[0]] + fock_occ[k[1], k[1]] - virt_e[:, numpy.newaxis] - virt_e[numpy.newaxis, :]
         dt = v / denominator
-        dt_pao = common.transform(dt, basis.T)
+        # The local basis is square: the same prepared transform applies to its transpose
+        dt_pao = transform(dt, basis.T)
 
         result[k] = dt_pao
         t2_diff = max(t2_diff, numpy.abs(dt_pao).max())
@@ -223,7 +227,7 @@ def iter_local_conventional(mol, mo_occ):
             yield i, j, local_atoms, numpy.argwhere(orbs)[:, 0]
 
 
-class AbstractLMP2IntegralProvider(common.SimpleCachingIntegralProvider):
+class AbstractLMP2IntegralProvider(common.IntegralProvider):
 
     def get_eri_diagonal_block(self, atoms):
         """
@@ -268,20 +272,22 @@ class SimpleLMP2IntegralProvider(AbstractLMP2IntegralProvider):
         See parent description.
         """
 
-        oovv = self.get_eri_diagonal_block(atoms).swapaxes(1, 2)
         lmo1 = lmo1[orbitals]
         lmo2 = lmo2[orbitals]
         pao = pao[numpy.ix_(orbitals, orbitals)]
-        result = common.transform(
-            common.transform(
-                common.transform(oovv, lmo1[:, numpy.newaxis], axes=0),
-                lmo2[:, numpy.newaxis],
-                axes=1,
-            ),
-            pao,
-            axes='l2',
-        )
-        return result[0, 0]
+
+        # Contract the first index tile by tile
+        ovov = None
+        offset = 0
+        for tile in self.iter_eri_tiles(atoms, atoms, atoms, atoms):
+            contribution = numpy.tensordot(lmo1[offset:offset+tile.shape[0]], tile, axes=(0, 0))
+            if ovov is None:
+                ovov = contribution
+            else:
+                ovov += contribution
+            offset += tile.shape[0]
+
+        return common.transform(numpy.tensordot(lmo2, ovov, axes=(0, 1)), pao)
 
     get_lmo_pao_block.__doc__ = AbstractLMP2IntegralProvider.get_lmo_pao_block.__doc__
 
@@ -324,6 +330,7 @@ class LMP2(object):
         self.domain_eri = None
         self.domain_fock_basis = None
         self.domain_fock_energies = None
+        self.domain_fock_transformer = None
         self.t2 = None
 
         # Energy
@@ -410,6 +417,7 @@ class LMP2(object):
         self.domain_eri = {}
         self.domain_fock_basis = {}
         self.domain_fock_energies = {}
+        self.domain_fock_transformer = {}
         self.t2 = {}
         for i, j, atoms, orbitals in self.local_space_provider(self.get_mol(), mo_loc):
             self.domain_orbital_map[i, j] = orbitals
@@ -428,6 +436,7 @@ class LMP2(object):
             energies, states = scipy.linalg.eigh(local_fock, local_ovlp)
             self.domain_fock_energies[i, j] = energies
             self.domain_fock_basis[i, j] = states
+            self.domain_fock_transformer[i, j] = common.build_transformer(states.shape, states.shape)
             self.t2[i, j] = numpy.zeros((len(orbitals),) * 2, dtype=self.domain_eri[i, j].dtype)
 
     def update_mp2_amplitudes(self):
@@ -450,6 +459,7 @@ class LMP2(object):
             self.fock_lmo,
             self.domain_fock_basis,
             self.domain_fock_energies,
+            transformers=self.domain_fock_transformer,
         )
         for k in mp2_t2_d:
             self.t2[k] += mp2_t2_d[k]
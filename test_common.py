@@ -194,6 +194,67 @@ class HydrogenChainTest(unittest.TestCase):
         """
         testing.assert_allclose(self.h6ip.get_eri([0], [1, 2], [1, 3], [4, 5]), self.h6dip.get_eri([0], [1, 2], [1, 3], [4, 5]))
 
+    def test_eri_sym(self):
+        """
+        Tests electron repulsion integrals packed with permutational symmetry.
+        """
+        testing.assert_allclose(
+            common.unpack_eri(self.h6ip.get_eri_sym([0, 3], [3, 0], [1, 2], [1, 2], aosym="s4"), "s4"),
+            self.h6ip.get_eri([0, 3], [0, 3], [1, 2], [1, 2]),
+        )
+        testing.assert_allclose(
+            common.unpack_eri(self.h6ip.get_eri_sym([1, 2], [1, 2], [1, 2], [1, 2], aosym="s8"), "s8"),
+            self.h6ip.get_eri([1, 2], [1, 2], [1, 2], [1, 2]),
+        )
+        with self.assertRaises(ValueError):
+            self.h6ip.get_eri_sym([0], [1], [0], [1])
+
+    def test_batch(self):
+        """
+        Tests concurrent integral evaluation.
+        """
+        ovlp, eri = self.h6ip.batch_intor((
+            ("int1e_ovlp_sph", [2], [3, 4]),
+            ("int2e_sph", [0], [1, 2], [1, 3], [4, 5]),
+        ))
+        testing.assert_allclose(ovlp, self.h6ip.get_ovlp([2], [3, 4]))
+        testing.assert_allclose(eri, self.h6ip.get_eri([0], [1, 2], [1, 3], [4, 5]))
+
+    def test_intor_no_hack(self):
+        """
+        Tests integrals evaluated without modifying the basis.
+        """
+        testing.assert_allclose(
+            self.h6ip.intor_atoms("int2e_sph", [0, 2], [1, 3], [1, 3], [0, 2], do_not_hack_pyscf=True),
+            self.h6ip.get_eri([0, 2], [1, 3], [1, 3], [0, 2]),
+        )
+        testing.assert_allclose(
+            self.h6ip.intor_atoms("int1e_ovlp_sph", [0, 2, 4], [1, 5], do_not_hack_pyscf=True),
+            self.h6ip.get_ovlp([0, 2, 4], [1, 5]),
+        )
+
+    def test_caching(self):
+        """
+        Tests cached integrals against directly evaluated ones.
+        """
+        provider = common.SimpleCachingIntegralProvider(self.h6chain)
+        for i in range(2):
+            testing.assert_allclose(
+                provider.get_eri([0, 3], [1, 4], [2, 5], [0, 5]),
+                self.h6ip.get_eri([0, 3], [1, 4], [2, 5], [0, 5]),
+            )
+            testing.assert_allclose(provider.get_hcore([0, 2], [1, 5]), self.h6ip.get_hcore([0, 2], [1, 5]))
+        self.assertGreater(provider.cache_factor(), 1)
+
+    def test_eri_tiles(self):
+        """
+        Tests tiled electron repulsion integrals.
+        """
+        testing.assert_allclose(
+            numpy.concatenate(tuple(self.h6ip.iter_eri_tiles(None, [1, 2], [1, 3], [4, 5], tile=4)), axis=0),
+            self.h6ip.get_eri(None, [1, 2], [1, 3], [4, 5]),
+        )
+
 
 class ThresholdTest(unittest.TestCase):
     @classmethod
@@ -248,3 +309,37 @@ class UtilityTest(unittest.TestCase):
         testing.assert_allclose(en, mf.e_tot)
         testing.assert_allclose(dm, mf.make_rdm1(), atol=1e-8)
         testing.assert_allclose(eps, mf.mo_energy, atol=1e-8)
+
+    def test_transform(self):
+        """
+        Tests transforms against explicit numpy.einsum expressions.
+        """
+        numpy.random.seed(0)
+        psi = numpy.random.rand(5, 2)
+        o = numpy.random.rand(5, 4, 5, 3)
+        for axes, reference in (
+                ((0,), numpy.einsum("abcd,ax->xbcd", o, psi)),
+                ((0, 2), numpy.einsum("abcd,ax,cy->xbyd", o, psi, psi)),
+                ((2, 0), numpy.einsum("abcd,ax,cy->xbyd", o, psi, psi)),
+        ):
+            for mode in ("fast", "onecall"):
+                testing.assert_allclose(common.transform(o, psi, axes=axes, mode=mode), reference)
+        o = numpy.random.rand(5, 5, 5, 5)
+        for axes, reference in (
+                ("all", numpy.einsum("abcd,aw,bx,cy,dz->wxyz", o, psi, psi, psi, psi)),
+                ("f2", numpy.einsum("abcd,ax,by->xycd", o, psi, psi)),
+                ("l2", numpy.einsum("abcd,cx,dy->abxy", o, psi, psi)),
+                (3, numpy.einsum("abcd,dx->abcx", o, psi)),
+        ):
+            for mode in ("fast", "onecall"):
+                testing.assert_allclose(common.transform(o, psi, axes=axes, mode=mode), reference)
+                transformer = common.build_transformer(o.shape, psi.shape, axes=axes, mode=mode)
+                testing.assert_allclose(transformer(o, psi), reference)
+                # Prepared transforms are reusable for other arrays of the same shape
+                o2 = numpy.random.rand(*o.shape)
+                testing.assert_allclose(transformer(o2, psi), common.transform(o2, psi, axes=axes, mode=mode))
+        m = numpy.random.rand(5, 5)
+        testing.assert_allclose(
+            common.build_transformer(m.shape, psi.shape)(m, psi),
+            numpy.einsum("ab,ax,by->xy", m, psi, psi),
+        )